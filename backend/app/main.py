@@ -1,14 +1,19 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
+from brotli_asgi import BrotliMiddleware
+import hashlib
+import json
+import os
 import time
 import logging 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from .models import OptimizacionRequest, OptimizacionResponse, ErrorResponse
 from .optimizer import OptimizadorPortafolio
+from .perfilado import PerfiladoMiddleware, PerfiladorSolicitudes
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +35,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Compresión Brotli (con GZip como alternativa) para respuestas grandes
+app.add_middleware(
+    BrotliMiddleware,
+    minimum_size=int(os.getenv("COMPRESION_TAMANO_MINIMO", "1000")),
+    gzip_fallback=True,
+)
+
+# Perfilado bajo demanda; deshabilitado si no se define PERFILADO_TOKEN
+perfilador = PerfiladorSolicitudes(
+    token=os.getenv("PERFILADO_TOKEN"),
+    capacidad=int(os.getenv("PERFILADO_CAPACIDAD", "50")),
+    top_n=int(os.getenv("PERFILADO_TOP_N", "20"))
+)
+app.add_middleware(PerfiladoMiddleware, perfilador=perfilador)
+
 # Instancia global del optimizador
-optimizador = OptimizadorPortafolio()
+# OPTIMIZADOR_HILOS > 1 activa el llenado paralelo de la tabla dp
+optimizador = OptimizadorPortafolio(
+    hilos=int(os.getenv("OPTIMIZADOR_HILOS", "1")),
+    tamano_minimo_bloque=int(os.getenv("OPTIMIZADOR_TAMANO_MINIMO_BLOQUE", "65536")),
+    envoltorio_tareas=perfilador.envolver_tarea
+)
+
+
+def calcular_etag(contenido: Any) -> str:
+    """
+    Calcula un ETag a partir del hash de la representación JSON canónica
+    (claves ordenadas, sin espacios) del contenido y la versión de la API.
+    
+    El ETag es débil porque se comparte entre las codificaciones identity,
+    gzip y br de la misma respuesta, cuyos bytes son distintos.
+    """
+    canonico = json.dumps(
+        {"version": app.version, "contenido": contenido},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return 'W/"' + hashlib.sha256(canonico.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str,
+                  aceptar_comodin: bool = False) -> bool:
+    """
+    Indica si la cabecera If-None-Match contiene el ETag (comparación débil).
+    
+    El comodín `*` solo cuenta si `aceptar_comodin` es True: un 304 solo es
+    válido cuando el cliente ya tiene el recurso.
+    """
+    if not if_none_match:
+        return False
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == "*" and aceptar_comodin:
+            return True
+        if candidato == etag:
+            return True
+    return False
 
 
 @app.exception_handler(RequestValidationError)
@@ -103,15 +169,21 @@ async def health_check():
 
 
 @app.post("/optimizar", response_model=OptimizacionResponse)
-async def optimizar_portafolio(request: OptimizacionRequest):
+async def optimizar_portafolio(request: OptimizacionRequest, http_request: Request,
+                               response: Response):
     """
     Optimiza la selección de inversiones para maximizar la ganancia
     sin exceder la capacidad presupuestaria.
     
     Utiliza programación dinámica para resolver el problema de la mochila.
+    La optimización es determinista, por lo que el ETag se calcula a partir
+    de la solicitud canónica; si coincide con If-None-Match se responde 304
+    sin volver a optimizar.
     
     Args:
         request: Datos de entrada con capacidad y lista de objetos
+        http_request: Solicitud HTTP, para leer If-None-Match
+        response: Respuesta HTTP, para agregar la cabecera ETag
         
     Returns:
         OptimizacionResponse: Resultado de la optimización
@@ -144,6 +216,12 @@ async def optimizar_portafolio(request: OptimizacionRequest):
                 detail="Los nombres de los objetos deben ser únicos"
             )
         
+        # Responder 304 si el cliente ya tiene este resultado
+        etag = calcular_etag(request.dict())
+        if etag_coincide(http_request.headers.get("if-none-match"), etag):
+            logger.info("Resultado no modificado, se responde 304")
+            return Response(status_code=304, headers={"ETag": etag})
+        
         # Ejecutar optimización
         start_time = time.time()
         resultado = optimizador.optimizar(request.capacidad, request.objetos)
@@ -153,6 +231,7 @@ async def optimizar_portafolio(request: OptimizacionRequest):
                    f"Ganancia: {resultado.ganancia_total}, "
                    f"Peso: {resultado.peso_total}")
         
+        response.headers["ETag"] = etag
         return resultado
         
     except HTTPException:
@@ -189,7 +268,7 @@ async def optimizar_portafolio_detallado(request: OptimizacionRequest):
         # Agregar información de rendimiento
         analisis['rendimiento'] = {
             'tiempo_ejecucion_ms': round(execution_time * 1000, 2),
-            'timestamp": time.time()
+            'timestamp': time.time()
         }
         
         logger.info(f"Análisis detallado completado en {execution_time:.4f}s")
@@ -204,53 +283,91 @@ async def optimizar_portafolio_detallado(request: OptimizacionRequest):
         )
 
 
-@app.get("/ejemplos")
-async def obtener_ejemplos():
-    """Proporciona ejemplos de uso de la API"""
-    return {
-        "ejemplos": {
-            "caso_1": {
-                "descripcion": "Máximo aprovechamiento de capacidad",
-                "entrada": {
-                    "capacidad": 10000,
-                    "objetos": [
-                        {"nombre": "Fondo_A", "peso": 2000, "ganancia": 1500},
-                        {"nombre": "Fondo_B", "peso": 4000, "ganancia": 3500},
-                        {"nombre": "Fondo_C", "peso": 5000, "ganancia": 4000},
-                        {"nombre": "Fondo_D", "peso": 3000, "ganancia": 2500},
-                        {"nombre": "Fondo_E", "peso": 1500, "ganancia": 1800}
-                    ]
-                },
-                "salida_esperada": {
-                    "seleccionados": ["Fondo_B", "Fondo_C", "Fondo_E"],
-                    "ganancia_total": 9300,
-                    "peso_total": 10000,
-                    "capacidad_utilizada": 100.0,
-                    "eficiencia": 0.93
-                }
+def verificar_token_perfilado(token: Optional[str]) -> None:
+    """Rechaza el acceso a los perfiles si el token de administración no es válido"""
+    if not perfilador.habilitado:
+        raise HTTPException(status_code=404, detail="El perfilado no está habilitado")
+    if not perfilador.token_valido(token):
+        raise HTTPException(status_code=403, detail="Token de perfilado inválido")
+
+
+@app.get("/perfiles", include_in_schema=False)
+async def listar_perfiles(x_perfilado_token: Optional[str] = Header(None)):
+    """Lista los perfiles de solicitudes retenidos (requiere token de administración)"""
+    verificar_token_perfilado(x_perfilado_token)
+    return {"perfiles": perfilador.listar()}
+
+
+@app.get("/perfiles/{perfil_id}", include_in_schema=False)
+async def obtener_perfil(perfil_id: str, x_perfilado_token: Optional[str] = Header(None)):
+    """Devuelve el informe de funciones más costosas de un perfil"""
+    verificar_token_perfilado(x_perfilado_token)
+    perfil = perfilador.obtener(perfil_id)
+    if perfil is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return perfil
+
+
+# Ejemplos de uso estáticos; su ETag se calcula una sola vez
+EJEMPLOS = {
+    "ejemplos": {
+        "caso_1": {
+            "descripcion": "Máximo aprovechamiento de capacidad",
+            "entrada": {
+                "capacidad": 10000,
+                "objetos": [
+                    {"nombre": "Fondo_A", "peso": 2000, "ganancia": 1500},
+                    {"nombre": "Fondo_B", "peso": 4000, "ganancia": 3500},
+                    {"nombre": "Fondo_C", "peso": 5000, "ganancia": 4000},
+                    {"nombre": "Fondo_D", "peso": 3000, "ganancia": 2500},
+                    {"nombre": "Fondo_E", "peso": 1500, "ganancia": 1800}
+                ]
             },
-            "caso_2": {
-                "descripcion": "Capacidad limitada",
-                "entrada": {
-                    "capacidad": 8000,
-                    "objetos": [
-                        {"nombre": "Acción_X", "peso": 1000, "ganancia": 800},
-                        {"nombre": "Acción_Y", "peso": 2500, "ganancia": 2200},
-                        {"nombre": "Acción_Z", "peso": 3000, "ganancia": 2800},
-                        {"nombre": "Bono_P", "peso": 4000, "ganancia": 3000},
-                        {"nombre": "Bono_Q", "peso": 1500, "ganancia": 1200}
-                    ]
-                },
-                "salida_esperada": {
-                    "seleccionados": ["Acción_Y", "Acción_Z", "Bono_Q"],
-                    "ganancia_total": 6200,
-                    "peso_total": 7000,
-                    "capacidad_utilizada": 87.5,
-                    "eficiencia": 0.8857
-                }
+            "salida_esperada": {
+                "seleccionados": ["Fondo_B", "Fondo_C", "Fondo_E"],
+                "ganancia_total": 9300,
+                "peso_total": 10000,
+                "capacidad_utilizada": 100.0,
+                "eficiencia": 0.93
+            }
+        },
+        "caso_2": {
+            "descripcion": "Capacidad limitada",
+            "entrada": {
+                "capacidad": 8000,
+                "objetos": [
+                    {"nombre": "Acción_X", "peso": 1000, "ganancia": 800},
+                    {"nombre": "Acción_Y", "peso": 2500, "ganancia": 2200},
+                    {"nombre": "Acción_Z", "peso": 3000, "ganancia": 2800},
+                    {"nombre": "Bono_P", "peso": 4000, "ganancia": 3000},
+                    {"nombre": "Bono_Q", "peso": 1500, "ganancia": 1200}
+                ]
+            },
+            "salida_esperada": {
+                "seleccionados": ["Acción_Y", "Acción_Z", "Bono_Q"],
+                "ganancia_total": 6200,
+                "peso_total": 7000,
+                "capacidad_utilizada": 87.5,
+                "eficiencia": 0.8857
             }
         }
     }
+}
+
+ETAG_EJEMPLOS = calcular_etag(EJEMPLOS)
+CACHE_CONTROL_EJEMPLOS = "public, max-age=3600"
+
+
+@app.get("/ejemplos")
+async def obtener_ejemplos(http_request: Request, response: Response):
+    """Proporciona ejemplos de uso de la API"""
+    headers = {"ETag": ETAG_EJEMPLOS, "Cache-Control": CACHE_CONTROL_EJEMPLOS}
+    if etag_coincide(http_request.headers.get("if-none-match"), ETAG_EJEMPLOS,
+                     aceptar_comodin=True):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return EJEMPLOS
 
 
 if __name__ == "__main__":
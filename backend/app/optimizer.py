@@ -1,4 +1,8 @@
-from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Dict
+
+import numpy as np
+
 from .models import Objeto, OptimizacionResponse
  
 
@@ -8,9 +12,31 @@ class OptimizadorPortafolio:
     utilizando programación dinámica para resolver el problema de la mochila
     """
     
-    def __init__(self):
+    def __init__(self, hilos: int = 1, tamano_minimo_bloque: int = 65536,
+                 envoltorio_tareas: Optional[Callable[[Callable], Callable]] = None):
+        """
+        Args:
+            hilos: Número de hilos para el llenado de la tabla dp. Con 1 se usa
+                el algoritmo secuencial; con más de 1 cada fila se reparte en
+                bloques de capacidad que se calculan en paralelo.
+            tamano_minimo_bloque: Número mínimo de celdas de capacidad por bloque,
+                para no pagar la sincronización en instancias pequeñas.
+            envoltorio_tareas: Función opcional que recibe la tarea de llenado
+                de bloques antes de enviarla al pool de hilos y devuelve la
+                función a ejecutar (por ejemplo, para perfilarla). Se llama
+                una vez por optimización.
+        """
+        if hilos < 1:
+            raise ValueError('El número de hilos debe ser al menos 1')
+        if tamano_minimo_bloque < 1:
+            raise ValueError('El tamaño mínimo de bloque debe ser al menos 1')
+        
         self.dp_table = None
         self.selected_items = None
+        self.hilos = hilos
+        self.tamano_minimo_bloque = tamano_minimo_bloque
+        self.envoltorio_tareas = envoltorio_tareas
+        self._executor = None
     
     def optimizar(self, capacidad: int, objetos: List[Objeto]) -> OptimizacionResponse:
         """
@@ -39,9 +65,14 @@ class OptimizadorPortafolio:
         nombres = [obj.nombre for obj in objetos]
         
         # Resolver usando programación dinámica
-        ganancia_maxima, items_seleccionados = self._knapsack_dp(
-            capacidad, pesos, ganancias, len(objetos)
-        )
+        if self.hilos > 1:
+            ganancia_maxima, items_seleccionados = self._knapsack_dp_paralelo(
+                capacidad, pesos, ganancias, len(objetos)
+            )
+        else:
+            ganancia_maxima, items_seleccionados = self._knapsack_dp(
+                capacidad, pesos, ganancias, len(objetos)
+            )
         
         # Obtener nombres de objetos seleccionados
         nombres_seleccionados = [nombres[i] for i in items_seleccionados]
@@ -101,6 +132,93 @@ class OptimizadorPortafolio:
         
         return dp[n][capacidad], items_seleccionados[::-1]
     
+    def _knapsack_dp_paralelo(self, capacidad: int, pesos: List[int],
+                              ganancias: List[int], n: int) -> Tuple[int, List[int]]:
+        """
+        Variante paralela de `_knapsack_dp`.
+        
+        Dentro de una fila todas las celdas de capacidad son independientes, así
+        que el rango [0, capacidad] se divide en bloques que calculan varios hilos
+        sobre buffers NumPy compartidos (las operaciones de NumPy liberan el GIL).
+        Solo se guardan dos filas de ganancias y una matriz booleana de decisiones
+        para reconstruir la solución.
+        
+        Args:
+            capacidad: Capacidad total de la mochila
+            pesos: Lista de pesos de los objetos
+            ganancias: Lista de ganancias de los objetos
+            n: Número de objetos
+            
+        Returns:
+            Tuple[int, List[int]]: (ganancia máxima, índices de objetos seleccionados)
+        """
+        anterior = np.zeros(capacidad + 1, dtype=np.int64)
+        actual = np.empty_like(anterior)
+        # tomado[i][w] indica si el objeto i mejora la ganancia con capacidad w
+        tomado = np.zeros((n, capacidad + 1), dtype=np.bool_)
+        
+        bloques = self._dividir_capacidad(capacidad + 1)
+        executor = self._obtener_executor() if len(bloques) > 1 else None
+        llenar_bloque = self._llenar_bloque
+        if executor is not None and self.envoltorio_tareas is not None:
+            llenar_bloque = self.envoltorio_tareas(llenar_bloque)
+        
+        for i in range(n):
+            peso, ganancia = pesos[i], ganancias[i]
+            if executor is None:
+                for inicio, fin in bloques:
+                    self._llenar_bloque(anterior, actual, tomado[i], peso, ganancia, inicio, fin)
+            else:
+                # Esperar a todos los bloques antes de pasar a la siguiente fila
+                list(executor.map(
+                    lambda bloque: llenar_bloque(
+                        anterior, actual, tomado[i], peso, ganancia, *bloque
+                    ),
+                    bloques
+                ))
+            anterior, actual = actual, anterior
+        
+        # Reconstruir la solución
+        items_seleccionados = []
+        w = capacidad
+        
+        for i in range(n - 1, -1, -1):
+            if tomado[i][w]:
+                items_seleccionados.append(i)
+                w -= pesos[i]
+        
+        return int(anterior[capacidad]), items_seleccionados[::-1]
+    
+    @staticmethod
+    def _llenar_bloque(anterior: np.ndarray, actual: np.ndarray, tomado: np.ndarray,
+                       peso: int, ganancia: int, inicio: int, fin: int) -> None:
+        """Calcula las celdas [inicio, fin) de una fila de la tabla dp."""
+        actual[inicio:fin] = anterior[inicio:fin]
+        
+        # Solo las capacidades w >= peso pueden incluir el objeto
+        desde = max(inicio, peso)
+        if desde >= fin:
+            return
+        
+        candidato = anterior[desde - peso:fin - peso] + ganancia
+        mejora = candidato > anterior[desde:fin]
+        tomado[desde:fin] = mejora
+        np.maximum(actual[desde:fin], candidato, out=actual[desde:fin])
+    
+    def _dividir_capacidad(self, celdas: int) -> List[Tuple[int, int]]:
+        """Divide el rango de capacidades en bloques de al menos `tamano_minimo_bloque`."""
+        tamano = max(self.tamano_minimo_bloque, -(-celdas // self.hilos))
+        return [(inicio, min(inicio + tamano, celdas)) for inicio in range(0, celdas, tamano)]
+    
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        """Crea el pool de hilos la primera vez que se necesita."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.hilos,
+                thread_name_prefix='knapsack-dp'
+            )
+        return self._executor
+    
     def obtener_analisis_detallado(self, capacidad: int, objetos: List[Objeto]) -> Dict:
         """
         Proporciona un análisis detallado de la optimización.
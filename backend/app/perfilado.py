@@ -0,0 +1,264 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+
+class _PerfilesHilos:
+    """
+    Perfiladores de los hilos de trabajo durante una solicitud perfilada: uno
+    por hilo, reutilizado en todas las tareas que ese hilo ejecuta.
+    """
+    
+    def __init__(self):
+        self.perfiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+    
+    def ejecutar(self, funcion: Callable, *args, **kwargs):
+        """Ejecuta una tarea bajo el perfilador del hilo actual"""
+        perfilador = getattr(self._local, "perfilador", None)
+        if perfilador is None:
+            perfilador = self._local.perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Otra herramienta de perfilado está activa; se ejecuta sin perfilar
+            return funcion(*args, **kwargs)
+        
+        # Se registra tras la primera activación para no combinar perfiles vacíos
+        if not getattr(self._local, "registrado", False):
+            self._local.registrado = True
+            self.perfiles.append(perfilador)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            # Se desactiva entre tareas para no medir la espera del hilo en la cola
+            perfilador.disable()
+
+
+# Perfiladores de los hilos de trabajo de la solicitud que se está perfilando
+_perfiles_hilos: ContextVar[Optional[_PerfilesHilos]] = ContextVar(
+    "perfiles_hilos", default=None
+)
+
+# Rutas de la biblioteca estándar y de site-packages; sus funciones no se
+# listan en el ranking por tiempo acumulado (middlewares, routing, asyncio)
+_RUTAS_EXTERNAS = tuple(sorted({
+    ruta for clave in ("stdlib", "platstdlib", "purelib", "platlib")
+    if (ruta := sysconfig.get_paths().get(clave))
+}))
+
+# Desde Python 3.12 cProfile usa sys.monitoring, compartido por todo el
+# intérprete: el perfilador de la solicitud ya ve los hilos del pool y no se
+# puede activar otro a la vez
+_PERFILADO_GLOBAL = sys.version_info >= (3, 12)
+
+# Esperas del hilo del event loop mientras trabajan los hilos del pool; ese
+# tiempo ya aparece en los perfiles de los propios hilos
+_ESPERAS = frozenset({"<method 'acquire' of '_thread.lock' objects>"})
+
+
+def _es_codigo_aplicacion(archivo: str) -> bool:
+    """Indica si una función pertenece al código de la aplicación"""
+    # "~" son funciones built-in y "<frozen ...>" módulos congelados de la stdlib
+    if archivo == "~" or archivo.startswith("<") or archivo == __file__:
+        return False
+    return not archivo.startswith(_RUTAS_EXTERNAS)
+
+
+class PerfiladorSolicitudes:
+    """
+    Perfilado bajo demanda de solicitudes individuales.
+    
+    Una solicitud se perfila solo si incluye la cabecera `X-Perfilar: 1` (o el
+    parámetro `?perfilar=1`) junto con `X-Perfilado-Token` igual al token de
+    administración configurado. Sin token configurado el perfilado queda
+    deshabilitado. Los informes se guardan en un buffer circular acotado.
+    """
+    
+    def __init__(self, token: Optional[str] = None, capacidad: int = 50, top_n: int = 20,
+                 rutas: Iterable[str] = ("/optimizar", "/optimizar/detallado")):
+        """
+        Args:
+            token: Token de administración; si es None o vacío no se perfila nada
+            capacidad: Número máximo de informes retenidos
+            top_n: Número de funciones incluidas en cada informe
+            rutas: Rutas en las que se permite el perfilado
+        """
+        if capacidad < 1:
+            raise ValueError('La capacidad del buffer de perfiles debe ser al menos 1')
+        if top_n < 1:
+            raise ValueError('El número de funciones del informe debe ser al menos 1')
+        
+        self.token = token or None
+        self.top_n = top_n
+        self.rutas = frozenset(rutas)
+        self._perfiles: Deque[Dict[str, Any]] = deque(maxlen=capacidad)
+        # cProfile solo admite un perfilador activo por hilo
+        self._lock = asyncio.Lock()
+    
+    @property
+    def habilitado(self) -> bool:
+        """Indica si hay un token de administración configurado"""
+        return self.token is not None
+    
+    def token_valido(self, token: Optional[str]) -> bool:
+        """Compara el token recibido con el configurado en tiempo constante"""
+        if not self.habilitado or not token:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+    
+    def debe_perfilar(self, scope: Dict[str, Any]) -> bool:
+        """Indica si la solicitud ASGI pidió perfilado y está autorizada"""
+        if not self.habilitado or scope["type"] != "http" or scope["path"] not in self.rutas:
+            return False
+        
+        headers = dict(scope["headers"])
+        solicitado = (
+            headers.get(b"x-perfilar") == b"1"
+            or b"perfilar=1" in scope.get("query_string", b"").split(b"&")
+        )
+        if not solicitado:
+            return False
+        
+        token = headers.get(b"x-perfilado-token")
+        return self.token_valido(token.decode("latin-1") if token else None)
+    
+    def envolver_tarea(self, funcion: Callable) -> Callable:
+        """
+        Prepara una función que se ejecutará en un pool de hilos para que, si la
+        solicitud actual se está perfilando, se perfile en cada hilo y se sume
+        al informe. Sin perfilado activo devuelve la función sin cambios.
+        
+        Se usa como `envoltorio_tareas` de `OptimizadorPortafolio` y debe
+        llamarse desde el hilo de la solicitud, antes de enviar las tareas.
+        """
+        sesion = _perfiles_hilos.get()
+        if sesion is None or _PERFILADO_GLOBAL:
+            return funcion
+        return functools.partial(sesion.ejecutar, funcion)
+    
+    def listar(self) -> List[Dict[str, Any]]:
+        """Resumen de los perfiles retenidos, del más reciente al más antiguo"""
+        return [
+            {clave: perfil[clave] for clave in ("id", "ruta", "timestamp", "duracion_ms", "status")}
+            for perfil in reversed(self._perfiles)
+        ]
+    
+    def obtener(self, perfil_id: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el informe completo de un perfil, o None si ya no está retenido"""
+        for perfil in self._perfiles:
+            if perfil["id"] == perfil_id:
+                return perfil
+        return None
+    
+    def _generar_informe(self, perfilador: cProfile.Profile,
+                         perfiles_hilos: List[cProfile.Profile]) -> Dict[str, Any]:
+        """
+        Combina los perfiles del event loop y de los hilos de trabajo y extrae
+        dos rankings top-N:
+        
+        - `funciones`: código de la aplicación por tiempo acumulado, sin los
+          marcos de middlewares, routing ni biblioteca estándar.
+        - `funciones_tiempo_propio`: todas las funciones por tiempo propio, lo
+          que muestra validación de Pydantic, codificación JSON o NumPy.
+        
+        Los tiempos de los hilos se suman entre sí, por lo que pueden superar
+        la duración de la solicitud.
+        """
+        estadisticas = pstats.Stats(perfilador, *perfiles_hilos).stats
+        
+        aplicacion = [item for item in estadisticas.items() if _es_codigo_aplicacion(item[0][0])]
+        aplicacion.sort(key=lambda item: item[1][3], reverse=True)
+        
+        propias = [item for item in estadisticas.items() if item[0][2] not in _ESPERAS]
+        propias.sort(key=lambda item: item[1][2], reverse=True)
+        
+        return {
+            "funciones": self._formatear(aplicacion[:self.top_n]),
+            "funciones_tiempo_propio": self._formatear(propias[:self.top_n]),
+            "hilos_perfilados": len(perfiles_hilos)
+        }
+    
+    @staticmethod
+    def _formatear(items) -> List[Dict[str, Any]]:
+        """Convierte entradas de pstats en el formato del informe"""
+        informe = []
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in items:
+            informe.append({
+                "funcion": f"{archivo}:{linea}({funcion})",
+                "llamadas": llamadas,
+                "tiempo_propio_ms": round(propio * 1000, 3),
+                "tiempo_acumulado_ms": round(acumulado * 1000, 3)
+            })
+        return informe
+    
+    async def perfilar(self, app, scope, receive, send) -> None:
+        """
+        Ejecuta la aplicación ASGI bajo cProfile y guarda el informe.
+        
+        El id del perfil se devuelve en la cabecera `X-Perfil-Id`. El perfilador
+        mide todo lo que se ejecuta en el hilo del event loop, por lo que otras
+        solicitudes concurrentes pueden aparecer en el informe. Las tareas que
+        se envían a un pool mediante `envolver_tarea` se perfilan con un
+        perfilador por hilo y se combinan en el mismo informe.
+        """
+        perfil_id = uuid.uuid4().hex
+        status = {"codigo": None}
+        
+        async def send_con_id(mensaje):
+            if mensaje["type"] == "http.response.start":
+                status["codigo"] = mensaje["status"]
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-perfil-id", perfil_id.encode("latin-1"))
+                ]
+            await send(mensaje)
+        
+        async with self._lock:
+            perfilador = cProfile.Profile()
+            sesion = _PerfilesHilos()
+            contexto = _perfiles_hilos.set(sesion)
+            inicio = time.perf_counter()
+            perfilador.enable()
+            try:
+                await app(scope, receive, send_con_id)
+            finally:
+                perfilador.disable()
+                duracion = time.perf_counter() - inicio
+                _perfiles_hilos.reset(contexto)
+                self._perfiles.append({
+                    "id": perfil_id,
+                    "ruta": scope["path"],
+                    "timestamp": time.time(),
+                    "duracion_ms": round(duracion * 1000, 2),
+                    "status": status["codigo"],
+                    **self._generar_informe(perfilador, sesion.perfiles)
+                })
+
+
+class PerfiladoMiddleware:
+    """
+    Middleware ASGI que perfila las solicitudes autorizadas.
+    
+    Se implementa como middleware ASGI puro para que las solicitudes sin
+    perfilado solo paguen la comprobación de ruta y cabeceras.
+    """
+    
+    def __init__(self, app, perfilador: PerfiladorSolicitudes):
+        self.app = app
+        self.perfilador = perfilador
+    
+    async def __call__(self, scope, receive, send):
+        if not self.perfilador.debe_perfilar(scope):
+            await self.app(scope, receive, send)
+            return
+        await self.perfilador.perfilar(self.app, scope, receive, send)
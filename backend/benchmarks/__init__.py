@@ -0,0 +1,2 @@
+# Benchmarks del microservicio de optimización
+
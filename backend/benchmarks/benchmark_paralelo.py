@@ -0,0 +1,85 @@
+"""
+Benchmark de escalabilidad del llenado paralelo de la tabla dp.
+
+Mide el tiempo de `OptimizadorPortafolio.optimizar` para una misma instancia
+grande con distinto número de hilos y muestra la aceleración respecto al
+modo paralelo con un solo bloque.
+
+Uso:
+    cd backend
+    python -m benchmarks.benchmark_paralelo --capacidad 2000000 --objetos 60
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Objeto
+from app.optimizer import OptimizadorPortafolio
+
+
+def generar_instancia(num_objetos: int, capacidad: int, semilla: int = 0) -> List[Objeto]:
+    """Genera objetos aleatorios con la misma forma que los casos de /ejemplos"""
+    rng = random.Random(semilla)
+    peso_maximo = min(1000000, max(1, capacidad // 4))
+    objetos = []
+    for i in range(num_objetos):
+        peso = rng.randint(1, peso_maximo)
+        # Ganancia cercana al peso, como en los fondos, acciones y bonos de ejemplo
+        ganancia = min(1000000, int(peso * rng.uniform(0.6, 1.3)))
+        objetos.append(Objeto(nombre=f"Inversion_{i}", peso=peso, ganancia=ganancia))
+    return objetos
+
+
+def medir(optimizador: OptimizadorPortafolio, capacidad: int, objetos: List[Objeto],
+          repeticiones: int) -> float:
+    """Devuelve el mejor tiempo (en segundos) de varias repeticiones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        optimizador.optimizar(capacidad, objetos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--capacidad', type=int, default=2000000)
+    parser.add_argument('--objetos', type=int, default=60)
+    parser.add_argument('--hilos', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16])
+    parser.add_argument('--tamano-minimo-bloque', type=int, default=65536)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    objetos = generar_instancia(args.objetos, args.capacidad, args.semilla)
+    print(f"Instancia: capacidad={args.capacidad}, objetos={args.objetos}, "
+          f"núcleos disponibles={os.cpu_count()}")
+
+    # Referencia: mismo algoritmo vectorizado con un único bloque
+    base = None
+    resultado_base = None
+    print(f"{'hilos':>6} {'tiempo (s)':>12} {'aceleración':>12}")
+    for hilos in args.hilos:
+        # Con 1 hilo se fuerza un único bloque para medir el mismo algoritmo
+        # vectorizado sin reparto, en lugar del llenado secuencial en Python
+        optimizador = OptimizadorPortafolio(
+            hilos=max(hilos, 2),
+            tamano_minimo_bloque=args.capacidad + 1 if hilos == 1 else args.tamano_minimo_bloque
+        )
+        tiempo = medir(optimizador, args.capacidad, objetos, args.repeticiones)
+        resultado = optimizador.optimizar(args.capacidad, objetos)
+        if base is None:
+            base, resultado_base = tiempo, resultado
+        elif resultado != resultado_base:
+            raise RuntimeError(f"Resultado distinto con {hilos} hilos")
+        print(f"{hilos:>6} {tiempo:>12.4f} {base / tiempo:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
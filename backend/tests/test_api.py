@@ -0,0 +1,223 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app, calcular_etag, etag_coincide, perfilador
+from app.optimizer import OptimizadorPortafolio
+from app import perfilado
+from app.perfilado import PerfiladoMiddleware, PerfiladorSolicitudes
+
+
+class TestCacheHTTP:
+    """Clase de pruebas para ETag, solicitudes condicionales y compresión"""
+    
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.cliente = TestClient(app)
+        self.solicitud = {
+            "capacidad": 1000,
+            "objetos": [
+                {"nombre": "A", "peso": 300, "ganancia": 200},
+                {"nombre": "B", "peso": 400, "ganancia": 300}
+            ]
+        }
+    
+    def test_etag_canonico(self):
+        """Prueba que el ETag no depende del orden de las claves"""
+        assert calcular_etag({"a": 1, "b": 2}) == calcular_etag({"b": 2, "a": 1})
+        assert calcular_etag({"a": 1}) != calcular_etag({"a": 2})
+        # Débil: se comparte entre codificaciones de contenido
+        assert calcular_etag({"a": 1}).startswith('W/"')
+    
+    def test_etag_coincide(self):
+        """Prueba el análisis de la cabecera If-None-Match"""
+        etag = calcular_etag({"a": 1})
+        assert etag_coincide(etag, etag)
+        assert etag_coincide(f'"otro", {etag}', etag)
+        assert etag_coincide(etag[2:], etag)
+        assert etag_coincide("*", etag, aceptar_comodin=True)
+        assert not etag_coincide("*", etag)
+        assert not etag_coincide(None, etag)
+        assert not etag_coincide('"otro"', etag)
+    
+    def test_optimizar_304_con_if_none_match(self):
+        """Prueba que /optimizar responde 304 si el ETag coincide"""
+        respuesta = self.cliente.post("/optimizar", json=self.solicitud)
+        assert respuesta.status_code == 200
+        etag = respuesta.headers["etag"]
+        
+        repetida = self.cliente.post("/optimizar", json=self.solicitud,
+                                     headers={"If-None-Match": etag})
+        assert repetida.status_code == 304
+        assert repetida.headers["etag"] == etag
+        assert repetida.content == b""
+    
+    def test_optimizar_comodin_no_devuelve_304(self):
+        """Prueba que If-None-Match: * en /optimizar devuelve el resultado"""
+        respuesta = self.cliente.post("/optimizar", json=self.solicitud,
+                                      headers={"If-None-Match": "*"})
+        assert respuesta.status_code == 200
+        assert respuesta.json()["ganancia_total"] == 500
+    
+    def test_optimizar_etag_distinto_por_solicitud(self):
+        """Prueba que solicitudes distintas producen ETags distintos"""
+        otra = dict(self.solicitud, capacidad=500)
+        etag_1 = self.cliente.post("/optimizar", json=self.solicitud).headers["etag"]
+        respuesta = self.cliente.post("/optimizar", json=otra,
+                                      headers={"If-None-Match": etag_1})
+        assert respuesta.status_code == 200
+        assert respuesta.headers["etag"] != etag_1
+    
+    def test_ejemplos_cache_control_y_304(self):
+        """Prueba las cabeceras de caché de /ejemplos"""
+        respuesta = self.cliente.get("/ejemplos")
+        assert respuesta.status_code == 200
+        assert respuesta.headers["cache-control"] == "public, max-age=3600"
+        
+        repetida = self.cliente.get("/ejemplos",
+                                    headers={"If-None-Match": respuesta.headers["etag"]})
+        assert repetida.status_code == 304
+    
+    @pytest.mark.parametrize("codificacion", ["br", "gzip"])
+    def test_compresion(self, codificacion):
+        """Prueba que las respuestas grandes se comprimen"""
+        respuesta = self.cliente.get("/ejemplos", headers={"Accept-Encoding": codificacion})
+        assert respuesta.headers["content-encoding"] == codificacion
+        assert "ejemplos" in respuesta.json()
+    
+    def test_etag_debil_entre_codificaciones(self):
+        """Prueba que el ETag compartido entre codificaciones es débil"""
+        br = self.cliente.get("/ejemplos", headers={"Accept-Encoding": "br"})
+        gzip = self.cliente.get("/ejemplos", headers={"Accept-Encoding": "gzip"})
+        assert br.headers["etag"] == gzip.headers["etag"]
+        assert br.headers["etag"].startswith('W/"')
+
+
+class TestPerfilado:
+    """Clase de pruebas para el perfilado bajo demanda"""
+    
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.cliente = TestClient(app)
+        self.solicitud = {
+            "capacidad": 1000,
+            "objetos": [{"nombre": "A", "peso": 300, "ganancia": 200}]
+        }
+        self.admin = {"X-Perfilado-Token": "secreto"}
+    
+    def test_deshabilitado_sin_token(self, monkeypatch):
+        """Prueba que sin token configurado no se perfila ni se exponen perfiles"""
+        monkeypatch.setattr(perfilador, "token", None)
+        respuesta = self.cliente.post("/optimizar", json=self.solicitud,
+                                      headers={"X-Perfilar": "1", **self.admin})
+        assert respuesta.status_code == 200
+        assert "x-perfil-id" not in respuesta.headers
+        assert self.cliente.get("/perfiles", headers=self.admin).status_code == 404
+    
+    def test_token_invalido(self, monkeypatch):
+        """Prueba que un token incorrecto no activa el perfilado"""
+        monkeypatch.setattr(perfilador, "token", "secreto")
+        respuesta = self.cliente.post("/optimizar?perfilar=1", json=self.solicitud,
+                                      headers={"X-Perfilado-Token": "otro"})
+        assert "x-perfil-id" not in respuesta.headers
+        assert self.cliente.get("/perfiles", headers={"X-Perfilado-Token": "otro"}).status_code == 403
+    
+    def test_perfil_detallado(self, monkeypatch):
+        """Prueba que se guarda y recupera el informe de un perfil"""
+        monkeypatch.setattr(perfilador, "token", "secreto")
+        respuesta = self.cliente.post("/optimizar/detallado", json=self.solicitud,
+                                      headers={"X-Perfilar": "1", **self.admin})
+        assert respuesta.status_code == 200
+        perfil_id = respuesta.headers["x-perfil-id"]
+        
+        resumen = self.cliente.get("/perfiles", headers=self.admin).json()["perfiles"]
+        assert resumen[0]["id"] == perfil_id
+        assert resumen[0]["ruta"] == "/optimizar/detallado"
+        
+        perfil = self.cliente.get(f"/perfiles/{perfil_id}", headers=self.admin).json()
+        assert 0 < len(perfil["funciones"]) <= perfilador.top_n
+        assert any("obtener_analisis_detallado" in f["funcion"] for f in perfil["funciones"])
+        acumulados = [f["tiempo_acumulado_ms"] for f in perfil["funciones"]]
+        assert acumulados == sorted(acumulados, reverse=True)
+        # Sin marcos de middlewares ni de la biblioteca estándar
+        assert not any("site-packages" in f["funcion"] for f in perfil["funciones"])
+        propios = [f["tiempo_propio_ms"] for f in perfil["funciones_tiempo_propio"]]
+        assert propios == sorted(propios, reverse=True)
+    
+    def test_perfil_modo_paralelo(self, monkeypatch):
+        """Prueba que el informe incluye el llenado de la tabla en los hilos del pool"""
+        monkeypatch.setattr(perfilador, "token", "secreto")
+        monkeypatch.setattr(main, "optimizador", OptimizadorPortafolio(
+            hilos=4, tamano_minimo_bloque=16, envoltorio_tareas=perfilador.envolver_tarea
+        ))
+        # 10 filas de 4 bloques: 40 tareas en el pool
+        solicitud = {
+            "capacidad": 1000,
+            "objetos": [{"nombre": f"Obj_{i}", "peso": 50 + i, "ganancia": 10 + i} for i in range(10)]
+        }
+        respuesta = self.cliente.post("/optimizar", json=solicitud,
+                                      headers={"X-Perfilar": "1", **self.admin})
+        assert respuesta.status_code == 200
+        
+        perfil = self.cliente.get(f"/perfiles/{respuesta.headers['x-perfil-id']}",
+                                  headers=self.admin).json()
+        if perfilado._PERFILADO_GLOBAL:
+            assert perfil["hilos_perfilados"] == 0
+        else:
+            # Un perfilador por hilo, no uno por tarea
+            assert 1 <= perfil["hilos_perfilados"] <= 4
+        llenado = [f for f in perfil["funciones"] if "_llenar_bloque" in f["funcion"]]
+        assert llenado and llenado[0]["llamadas"] == 40
+        assert not any("_thread.lock" in f["funcion"] for f in perfil["funciones_tiempo_propio"])
+    
+    def test_hilos_con_perfilado_global(self, monkeypatch):
+        """Prueba que en Python 3.12+ las tareas del pool no se envuelven"""
+        monkeypatch.setattr(perfilado, "_PERFILADO_GLOBAL", True)
+        contexto = perfilado._perfiles_hilos.set(perfilado._PerfilesHilos())
+        try:
+            assert perfilador.envolver_tarea(abs) is abs
+        finally:
+            perfilado._perfiles_hilos.reset(contexto)
+    
+    def test_hilos_sin_poder_activar_perfilador(self, monkeypatch):
+        """Prueba que si cProfile no se puede activar la tarea se ejecuta igual"""
+        class PerfiladorOcupado:
+            def enable(self):
+                raise ValueError("Another profiling tool is already active")
+        
+        monkeypatch.setattr(perfilado, "_PERFILADO_GLOBAL", False)
+        monkeypatch.setattr(perfilado.cProfile, "Profile", PerfiladorOcupado)
+        sesion = perfilado._PerfilesHilos()
+        contexto = perfilado._perfiles_hilos.set(sesion)
+        try:
+            duplicar = perfilador.envolver_tarea(lambda x: 2 * x)
+        finally:
+            perfilado._perfiles_hilos.reset(contexto)
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(duplicar, [1, 2])) == [2, 4]
+        assert sesion.perfiles == []
+    
+    def test_buffer_circular(self):
+        """Prueba que el buffer retiene solo los perfiles más recientes"""
+        async def app_trivial(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+        
+        local = PerfiladorSolicitudes(token="secreto", capacidad=2)
+        cliente = TestClient(PerfiladoMiddleware(app_trivial, perfilador=local))
+        ids = []
+        for _ in range(3):
+            respuesta = cliente.post("/optimizar", headers={"X-Perfilar": "1", **self.admin})
+            assert respuesta.status_code == 200
+            ids.append(respuesta.headers["x-perfil-id"])
+        
+        assert [p["id"] for p in local.listar()] == [ids[2], ids[1]]
+        assert local.obtener(ids[0]) is None
+        assert local.obtener(ids[2])["status"] == 200
@@ -1,4 +1,5 @@
 import pytest
+import random
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -184,6 +185,81 @@ class TestOptimizadorPortafolio:
         assert eficiencias[1]['eficiencia'] >= eficiencias[2]['eficiencia']
 
 
+class TestOptimizadorParalelo:
+    """Clase de pruebas para el llenado paralelo de la tabla dp"""
+    
+    def setup_method(self):
+        """Configuración inicial para cada prueba"""
+        self.secuencial = OptimizadorPortafolio()
+        # Bloques pequeños para forzar el reparto entre hilos
+        self.paralelo = OptimizadorPortafolio(hilos=4, tamano_minimo_bloque=16)
+    
+    def test_coincide_con_secuencial(self):
+        """Prueba que el modo paralelo obtiene la misma selección que el secuencial"""
+        capacidad = 10000
+        objetos = [
+            Objeto(nombre="Fondo_A", peso=2000, ganancia=1500),
+            Objeto(nombre="Fondo_B", peso=4000, ganancia=3500),
+            Objeto(nombre="Fondo_C", peso=5000, ganancia=4000),
+            Objeto(nombre="Fondo_D", peso=3000, ganancia=2500),
+            Objeto(nombre="Fondo_E", peso=1500, ganancia=1800)
+        ]
+        
+        esperado = self.secuencial.optimizar(capacidad, objetos)
+        resultado = self.paralelo.optimizar(capacidad, objetos)
+        
+        assert resultado == esperado
+    
+    def test_coincide_con_secuencial_instancias_aleatorias(self):
+        """Prueba instancias aleatorias con empates y objetos que no caben"""
+        rng = random.Random(42)
+        for _ in range(20):
+            capacidad = rng.randint(0, 500)
+            objetos = [
+                Objeto(nombre=f"Obj_{i}", peso=rng.randint(1, 200), ganancia=rng.randint(0, 100))
+                for i in range(rng.randint(1, 12))
+            ]
+            
+            esperado = self.secuencial.optimizar(capacidad, objetos)
+            resultado = self.paralelo.optimizar(capacidad, objetos)
+            
+            assert resultado == esperado
+    
+    def test_envoltorio_tareas(self):
+        """Prueba que el envoltorio recibe la tarea del pool una vez por optimización"""
+        envueltas = []
+        
+        def envoltorio(tarea):
+            envueltas.append(tarea)
+            return tarea
+        
+        optimizador = OptimizadorPortafolio(hilos=4, tamano_minimo_bloque=16,
+                                            envoltorio_tareas=envoltorio)
+        objetos = [Objeto(nombre=f"Obj_{i}", peso=50 + i, ganancia=10 + i) for i in range(5)]
+        
+        resultado = optimizador.optimizar(1000, objetos)
+        
+        assert resultado == self.secuencial.optimizar(1000, objetos)
+        assert envueltas == [optimizador._llenar_bloque]
+    
+    def test_capacidad_menor_que_bloque(self):
+        """Prueba que una instancia de un solo bloque no usa el pool de hilos"""
+        optimizador = OptimizadorPortafolio(hilos=4)
+        objetos = [Objeto(nombre="Solo", peso=500, ganancia=300)]
+        
+        resultado = optimizador.optimizar(1000, objetos)
+        
+        assert resultado.seleccionados == ["Solo"]
+        assert optimizador._executor is None
+    
+    def test_configuracion_invalida(self):
+        """Prueba validación del número de hilos y del tamaño de bloque"""
+        with pytest.raises(ValueError, match="El número de hilos debe ser al menos 1"):
+            OptimizadorPortafolio(hilos=0)
+        with pytest.raises(ValueError, match="El tamaño mínimo de bloque debe ser al menos 1"):
+            OptimizadorPortafolio(hilos=2, tamano_minimo_bloque=0)
+
+
 class TestModelos:
     """Clase de pruebas para los modelos Pydantic"""
     